@@ -1,38 +1,368 @@
 import argparse
-import pandas as pd
-import openpyxl
+import functools
+import glob
+import importlib.util
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# pandas, openpyxl and Polars are imported inside the functions that use them,
+# so that e.g. --help or an openpyxl-only action does not pay for loading pandas.
+
+# Aggregations with a compiled groupby implementation in pandas
+CYTHON_AGG_FUNCS = {'count', 'first', 'last', 'max', 'mean', 'median', 'min', 'nunique', 'prod', 'size', 'std', 'sum', 'var'}
+
+# pandas aggregation names and the Polars expression methods that compute the same thing
+POLARS_AGG_FUNCS = {'count': 'count', 'first': 'first', 'last': 'last', 'max': 'max', 'mean': 'mean',
+                    'median': 'median', 'min': 'min', 'nunique': 'n_unique', 'prod': 'product',
+                    'size': 'len', 'std': 'std', 'sum': 'sum', 'var': 'var'}
+
+# convert_column_type targets: (Arrow-backed dtype, NumPy-backed fallback)
+CONVERSION_DTYPES = {'int': ('int64[pyarrow]', 'Int64'), 'float': ('double[pyarrow]', 'float64'),
+                     'str': ('string[pyarrow]', 'string'), 'datetime': ('timestamp[ns][pyarrow]', 'datetime64[ns]')}
+
+# Row count above which pandas frames are handed to Polars for heavy operations
+POLARS_ROW_THRESHOLD = 100_000
+
+# Column added to frames handed to Polars to remember each row's original position
+_ROW_POSITION = '__row_position__'
+
+# --- I/O Helpers ---
+
+def _import_polars():
+    """Imports Polars, returning None if it is not installed."""
+    try:
+        import polars as pl
+    except ImportError:  # Polars is optional and only needed for --engine polars
+        return None
+    return pl
+
+def _is_polars(df):
+    """Returns True if the DataFrame is a Polars DataFrame or LazyFrame."""
+    # A Polars frame can only exist once Polars has been imported
+    pl = sys.modules.get('polars')
+    return pl is not None and isinstance(df, (pl.DataFrame, pl.LazyFrame))
+
+def _large_frame_to_polars(df):
+    """Converts a large pandas DataFrame to Polars.
+
+    Returns None if Polars is not installed, the frame is too small to be
+    worth the conversion, or it holds data Arrow cannot represent. Polars'
+    advantage comes from using several threads, so single-core machines also
+    stay on pandas.
+    """
+    if len(df) <= POLARS_ROW_THRESHOLD or (os.cpu_count() or 1) < 2 or _ROW_POSITION in df.columns:
+        return None
+    pl = _import_polars()
+    if pl is None:
+        return None
+    try:
+        return pl.from_pandas(df)
+    except (TypeError, ValueError, pl.exceptions.PolarsError):
+        return None
+
+def _polars_to_pandas(pl_df, like):
+    """Converts a Polars result back to pandas, restoring the index labels of the frame it came from.
+
+    pl_df must carry the _ROW_POSITION column, holding each row's position in like.
+    """
+    positions = pl_df.get_column(_ROW_POSITION).to_numpy()
+    df = pl_df.drop(_ROW_POSITION).to_pandas()
+    df.index = like.index.take(positions)
+    return df
+
+def _cache_path(path, engine, mtime_ns, size):
+    """Returns the Parquet cache file for one engine's read of one version of an Excel file.
+
+    Each engine has its own cache, because pandas and Polars infer different
+    dtypes from the same sheet (e.g. for a column mixing numbers and text).
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f".{name}.{engine}.{mtime_ns}-{size}.parquet")
+
+def _write_cache(df, path, engine, mtime_ns, size):
+    """Stores a DataFrame as the Parquet cache of an Excel file.
+
+    Caching is best-effort: a frame that cannot be stored as Parquet (e.g. a
+    column mixing numbers and text) or an unwritable directory is skipped.
+    Caches of older versions of the same file are removed, whichever engine
+    wrote them.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    cache_path = _cache_path(path, engine, mtime_ns, size)
+    current = {_cache_path(path, other, mtime_ns, size) for other in ('pandas', 'polars')}
+    tmp_path = f"{cache_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        if _is_polars(df):
+            df.write_parquet(tmp_path)
+        else:
+            df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+        for stale in glob.glob(os.path.join(glob.escape(directory), f".{glob.escape(name)}.*.parquet")):
+            if stale not in current:
+                os.remove(stale)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def read_input(path, engine='pandas', columns=None, cache=True):
+    """Reads the first sheet of an Excel file with the requested engine.
+
+    If columns is given, only those columns are read, in that order.
+
+    The parsed sheet is cached as Parquet next to the Excel file, keyed by its
+    modification time and size, so later runs on the same file skip the
+    (much slower) xlsx parsing. Only full reads populate the cache, but
+    column subsets are served from it. Within one process, recent reads are
+    also kept in memory, so library callers running several actions on the
+    same file only load it once. cache=False skips that in-memory cache
+    (the Parquet file is still used), for callers that read a file only once
+    and should not keep a second copy of it alive.
+
+    The polars engine returns a LazyFrame so that chained actions are
+    optimized together and only executed when the output is written.
+    """
+    stat = os.stat(path)
+    reader = _read_input_cached if cache else _read_input_cached.__wrapped__
+    df = reader(os.path.abspath(path), stat.st_mtime_ns, stat.st_size,
+                engine, tuple(columns) if columns else None)
+    # Polars frames are immutable, but pandas actions may modify the cached frame in place
+    return df.copy() if cache and not _is_polars(df) else df
+
+@functools.lru_cache(maxsize=8)
+def _read_input_cached(path, mtime_ns, size, engine, columns):
+    """Reads an Excel file for read_input; the file's mtime and size key the cache."""
+    columns = list(columns) if columns else None
+    if engine == 'polars':
+        pl = _import_polars()
+        if pl is None:
+            raise ImportError("The polars engine requires the 'polars' package")
+    else:
+        import pandas as pd
+    cache_path = _cache_path(path, engine, mtime_ns, size)
+    if os.path.exists(cache_path):
+        if engine == 'polars':
+            # Load the data rather than scanning lazily: the in-memory cache
+            # must not depend on the Parquet file, which may be deleted
+            df = pl.read_parquet(cache_path, columns=columns)
+            return df.lazy().select(columns) if columns else df.lazy()
+        return pd.read_parquet(cache_path, columns=columns)
+    if engine == 'polars':
+        df = pl.read_excel(path, columns=columns)
+    else:
+        df = pd.read_excel(path, engine='calamine', usecols=columns)
+    if columns:
+        return df.lazy().select(columns) if engine == 'polars' else df[columns]
+    _write_cache(df, path, engine, mtime_ns, size)
+    return df.lazy() if engine == 'polars' else df
+
+def _input_columns(args):
+    """Returns the input columns an action needs, or None if it needs all of them."""
+    if args.action == 'summarize':
+        return list(dict.fromkeys([args.group_by, args.agg_col]))
+    if args.action == 'filter' and args.columns:
+        return list(dict.fromkeys([*args.columns, args.column]))
+    if args.action == 'sort' and args.columns:
+        return list(dict.fromkeys([*args.columns, *args.by]))
+    return None
+
+def _merge_columns(on_column, select):
+    """Returns the columns merge needs from one input, or None for all of them."""
+    return list(dict.fromkeys([on_column, *select])) if select else None
+
+def write_output(df, path):
+    """Writes a DataFrame to an Excel file.
+
+    xlsxwriter is used instead of openpyxl because it serializes the cells
+    directly rather than building an openpyxl Cell object for each of them.
+    Polars results are written through pandas as well, because Polars'
+    write_excel formats the sheet as an Excel table; both engines thus
+    produce the same plain cells.
+    """
+    if _is_polars(df):
+        import polars as pl
+        if isinstance(df, pl.LazyFrame):
+            df = df.collect(engine='streaming')
+        df = df.to_pandas()
+    df.to_excel(path, index=False, engine='xlsxwriter')
+
+# --- Streaming Actions ---
+
+def _header_index(header, column):
+    """Returns the position of a column in the header row."""
+    try:
+        return header.index(column)
+    except ValueError:
+        raise ValueError(f"Column not found: {column}") from None
+
+def _stream_sheet(input_path, output_path, process):
+    """Copies the first sheet of an Excel file row by row in constant memory.
+
+    process receives the header row and an iterator over the data rows (tuples
+    of cell values) and returns the header and data rows to write. Neither
+    workbook is ever fully held in memory.
+    """
+    import openpyxl
+    import xlsxwriter
+    source = openpyxl.load_workbook(input_path, read_only=True, data_only=True)
+    try:
+        rows = source.worksheets[0].iter_rows(values_only=True)
+        header, out_rows = process(next(rows, ()), rows)
+        target = xlsxwriter.Workbook(output_path, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+        try:
+            sheet = target.add_worksheet('Sheet1')
+            sheet.write_row(0, 0, header)
+            for row_number, row in enumerate(out_rows, start=1):
+                sheet.write_row(row_number, 0, row)
+        except BaseException:
+            # Closing releases the row buffers' temporary files; the output is incomplete, so drop it
+            target.close()
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        target.close()
+    finally:
+        source.close()
+
+def stream_filter(input_path, output_path, column, value, columns=None):
+    """Filters rows like filter_data without loading the sheet into memory."""
+    def process(header, rows):
+        index = _header_index(header, column)
+        matching = (row for row in rows if index < len(row) and row[index] == value)
+        if not columns:
+            return header, matching
+        keep = [_header_index(header, col) for col in dict.fromkeys([*columns, column])]
+        return [header[i] for i in keep], ([row[i] if i < len(row) else None for i in keep] for row in matching)
+    _stream_sheet(input_path, output_path, process)
+
+def stream_fill_missing(input_path, output_path, columns, value):
+    """Fills empty cells like fill_missing_values without loading the sheet.
+
+    Column types are not known while streaming, so the value is always
+    written as given.
+    """
+    def process(header, rows):
+        fill = {_header_index(header, col) for col in columns} if columns else set(range(len(header)))
+        width = len(header)
+        return header, (
+            tuple(value if cell is None and i in fill else cell
+                  for i, cell in enumerate(row + (None,) * (width - len(row))))
+            for row in rows
+        )
+    _stream_sheet(input_path, output_path, process)
 
 # --- Action Functions ---
 
 def filter_data(df, column, value):
     """Filters the DataFrame based on a column and value."""
+    if _is_polars(df):
+        import polars as pl
+        # The CLI passes the value as text, which Polars refuses to compare with
+        # e.g. a number column; cast it to the column's type instead. Text that
+        # does not fit the type (e.g. "x" for a number column) matches nothing.
+        dtype = df.collect_schema()[column]
+        return df.filter(pl.col(column) == pl.lit(value).cast(dtype, strict=False))
     return df[df[column] == value]
 
 def summarize_data(df, group_by_column, agg_column, agg_func):
     """Summarizes the DataFrame by grouping and aggregating."""
-    return df.groupby(group_by_column)[agg_column].agg(agg_func).reset_index()
+    if _is_polars(df):
+        import polars as pl
+        method = POLARS_AGG_FUNCS.get(agg_func)
+        if method is None:
+            raise ValueError(f"Unsupported aggregation for the polars engine: {agg_func}")
+        values = pl.col(agg_column)
+        # pandas skips missing values in every aggregation except size
+        if agg_func != 'size':
+            values = values.drop_nulls()
+        # Match pandas: drop missing group keys and sort the groups
+        return (df.filter(pl.col(group_by_column).is_not_null())
+                  .group_by(group_by_column)
+                  .agg(getattr(values, method)())
+                  .sort(group_by_column))
+    grouped = df.groupby(group_by_column)[agg_column]
+    if agg_func in CYTHON_AGG_FUNCS:
+        return getattr(grouped, agg_func)().reset_index()
+    return grouped.agg(agg_func).reset_index()
 
 def calculate_column(df, new_column_name, expression):
     """Calculates a new column based on an expression."""
-    df[new_column_name] = df.eval(expression)
+    # numexpr evaluates the expression in multi-threaded, cache-sized chunks
+    engine = 'numexpr' if importlib.util.find_spec('numexpr') else 'python'
+    df[new_column_name] = df.eval(expression, engine=engine)
     return df
 
-def merge_data(df1, df2, on_column, how='inner'):
-    """Merges two DataFrames."""
+def merge_data(df1, df2, on_column, how='inner', select1=None, select2=None):
+    """Merges two DataFrames, optionally keeping only some columns of each."""
+    # Projecting before the join keeps the hash table and copied rows small
+    if select1:
+        df1 = select_columns_data(df1, list(dict.fromkeys([on_column, *select1])))
+    if select2:
+        df2 = select_columns_data(df2, list(dict.fromkeys([on_column, *select2])))
+    if _is_polars(df1):
+        # Polars calls an outer join 'full' and keeps both keys unless coalesced
+        how = 'full' if how == 'outer' else how
+        return df1.join(df2, on=on_column, how=how, coalesce=True)
+    import pandas as pd
     return pd.merge(df1, df2, on=on_column, how=how)
 
 def sort_data(df, by_columns, ascending=True):
     """Sorts the DataFrame."""
+    if _is_polars(df):
+        return df.sort(by_columns, descending=not ascending, nulls_last=True)
+    pl_df = _large_frame_to_polars(df)
+    if pl_df is not None:
+        # Polars sorts on multiple threads; the row positions carry the index labels through
+        return _polars_to_pandas(sort_data(pl_df.with_row_index(_ROW_POSITION), by_columns, ascending=ascending), df)
     return df.sort_values(by=by_columns, ascending=ascending)
 
 def rename_columns_data(df, rename_map):
     """Renames columns."""
     return df.rename(columns=rename_map)
 
+def select_columns_data(df, columns):
+    """Keeps only the given columns, in the given order."""
+    if _is_polars(df):
+        return df.select(columns)
+    return df[columns]
+
 def drop_duplicates_data(df, subset=None):
     """Drops duplicate rows."""
+    if _is_polars(df):
+        return df.unique(subset=subset, keep='first', maintain_order=True)
+    pl_df = _large_frame_to_polars(df)
+    if pl_df is not None:
+        # Polars hashes Arrow columns on multiple threads; the row positions
+        # carry the index labels through, but must not count as a duplicate key
+        result = drop_duplicates_data(pl_df.with_row_index(_ROW_POSITION), subset=subset or list(df.columns))
+        return _polars_to_pandas(result, df)
     return df.drop_duplicates(subset=subset)
 
+def run_pipeline(df, operations):
+    """Applies a list of operations to the DataFrame, in order.
+
+    Each operation is a dict with an 'action' key and that action's arguments,
+    e.g. {"action": "filter", "column": "Department", "value": "Sales"}.
+    """
+    for operation in operations:
+        action = operation['action']
+        if action == 'filter':
+            df = filter_data(df, operation['column'], operation['value'])
+        elif action == 'summarize':
+            df = summarize_data(df, operation['group_by'], operation['agg_col'], operation['agg_func'])
+        elif action == 'sort':
+            df = sort_data(df, operation['by'], ascending=(operation.get('order', 'asc') == 'asc'))
+        elif action == 'select':
+            df = select_columns_data(df, operation['columns'])
+        elif action == 'drop_duplicates':
+            df = drop_duplicates_data(df, subset=operation.get('subset'))
+        else:
+            raise ValueError(f"Unsupported pipeline action: {action}")
+    return df
+
 def duplicate_sheet_data(workbook, source_sheet_name, new_sheet_name):
     """Duplicates a sheet in the workbook."""
     source_sheet = workbook[source_sheet_name]
@@ -42,37 +372,52 @@ def duplicate_sheet_data(workbook, source_sheet_name, new_sheet_name):
 
 def update_cells_data(workbook, sheet_name, cell_updates):
     """Updates one or more cells in a specific sheet."""
+    from openpyxl.utils.cell import coordinate_to_tuple
     sheet = workbook[sheet_name]
-    for cell, value in cell_updates.items():
-        sheet[cell] = value
+    # Parse each coordinate once and write in (row, column) order
+    parsed_updates = sorted(
+        (coordinate_to_tuple(cell) + (value,) for cell, value in cell_updates.items()),
+        key=lambda update: update[:2]
+    )
+    for row, column, value in parsed_updates:
+        sheet.cell(row=row, column=column, value=value)
     return workbook
 
 def fill_missing_values(df, columns, value):
     """Fills missing values in specified columns."""
-    if columns:
-        for col in columns:
-            df.loc[:, col] = df[col].fillna(value)
-    else:
-        df = df.fillna(value)
-    return df
+    import pandas as pd
+    # Numeric columns get the value as a number so they keep a numeric dtype
+    try:
+        numeric_value = pd.to_numeric(value)
+    except (TypeError, ValueError):
+        numeric_value = value
+    fill_values = {col: numeric_value if pd.api.types.is_numeric_dtype(df[col]) else value
+                   for col in (columns or df.columns)}
+    return df.fillna(fill_values)
 
 def convert_column_type(df, column, data_type):
-    """Converts the data type of a column."""
-    if data_type == 'int':
-        # Convert to numeric first, then to nullable integer type
-        df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
-    elif data_type == 'float':
-        df[column] = pd.to_numeric(df[column], errors='coerce')
-    elif data_type == 'str':
-        df[column] = df[column].astype(str)
-    elif data_type == 'datetime':
-        df[column] = pd.to_datetime(df[column], errors='coerce')
-    else:
+    """Converts the data type of a column.
+
+    When pyarrow is installed the column is stored as an Arrow array (a
+    contiguous buffer instead of one Python object per value); otherwise the
+    NumPy-backed pandas dtypes are used. Missing values stay missing.
+    """
+    import pandas as pd
+    if data_type not in CONVERSION_DTYPES:
         raise ValueError(f"Unsupported data type for conversion: {data_type}")
+    arrow_dtype, numpy_dtype = CONVERSION_DTYPES[data_type]
+    values = df[column]
+    if data_type in ('int', 'float'):
+        values = pd.to_numeric(values, errors='coerce')
+    elif data_type == 'datetime':
+        values = pd.to_datetime(values, errors='coerce')
+    # Casting from NumPy (rather than using dtype_backend='pyarrow') turns NaN into a missing value
+    df[column] = values.astype(arrow_dtype if importlib.util.find_spec('pyarrow') else numpy_dtype)
     return df
 
 def create_chart(workbook, sheet_name, chart_type, x_column, y_columns, title, chart_title):
     """Creates a chart and adds it to a new sheet."""
+    import openpyxl.chart
     source_sheet = workbook[sheet_name]
     chart_sheet = workbook.create_sheet(title=chart_title)
 
@@ -83,23 +428,29 @@ def create_chart(workbook, sheet_name, chart_type, x_column, y_columns, title, c
     elif chart_type == 'pie':
         chart = openpyxl.chart.PieChart()
 
-    data_cols = []
-    for col in y_columns:
-        for i, column_cell in enumerate(source_sheet.iter_cols(min_row=1, max_row=1)):
-            if column_cell[0].value == col:
-                data_cols.append(i + 1)
-                break
-
-    cat_col = 0
-    for i, column_cell in enumerate(source_sheet.iter_cols(min_row=1, max_row=1)):
-        if column_cell[0].value == x_column:
-            cat_col = i + 1
-            break
-
-    data = openpyxl.chart.Reference(source_sheet, min_col=data_cols[0], min_row=2, max_row=source_sheet.max_row, max_col=data_cols[-1])
-    cats = openpyxl.chart.Reference(source_sheet, min_col=cat_col, min_row=2, max_row=source_sheet.max_row)
+    # Map each header to its 1-based column index in a single pass
+    headers = {}
+    for i, header in enumerate(next(source_sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())):
+        headers.setdefault(header, i + 1)
+    missing = [col for col in [x_column, *y_columns] if col not in headers]
+    if missing:
+        raise ValueError(f"Column(s) not found in sheet '{sheet_name}': {', '.join(map(str, missing))}")
+
+    data_cols = [headers[col] for col in y_columns]
+    cat_col = headers[x_column]
+
+    max_row = source_sheet.max_row
+    # Data references start at the header row, which titles_from_data uses as the series name
+    if data_cols == list(range(data_cols[0], data_cols[-1] + 1)):
+        data = openpyxl.chart.Reference(source_sheet, min_col=data_cols[0], min_row=1, max_row=max_row, max_col=data_cols[-1])
+        chart.add_data(data, titles_from_data=True)
+    else:
+        # Non-adjacent columns need one reference each so the columns between them are left out
+        for col in data_cols:
+            data = openpyxl.chart.Reference(source_sheet, min_col=col, min_row=1, max_row=max_row, max_col=col)
+            chart.add_data(data, titles_from_data=True)
+    cats = openpyxl.chart.Reference(source_sheet, min_col=cat_col, min_row=2, max_row=max_row)
 
-    chart.add_data(data, titles_from_data=True)
     chart.set_categories(cats)
     chart.title = title
 
@@ -107,96 +458,143 @@ def create_chart(workbook, sheet_name, chart_type, x_column, y_columns, title, c
 
     return workbook
 
-# --- Main Application ---
-
-def main():
-    parser = argparse.ArgumentParser(
-        description='A versatile CLI tool for automating Excel workflows.',
-        formatter_class=argparse.RawTextHelpFormatter
-    )
-    subparsers = parser.add_subparsers(dest='action', required=True, help='The action to perform')
-
-    # --- Filter Action Parser ---
+# --- Command-Line Interface ---
+
+# One "key:value" pair; the key ends at the first unescaped ':', the value at the next unescaped ','.
+# Only '\,', '\:' and '\\' are escapes; any other backslash is kept as typed (e.g. C:\temp).
+_PAIR_RE = re.compile(r'((?:[^:,\\]|\\[,:\\]|\\(?![,:\\]))*):((?:[^,\\]|\\[,:\\]|\\(?![,:\\]))*)(?:,|\Z)')
+_ESCAPE_RE = re.compile(r'\\([,:\\])')
+
+def parse_key_value_pairs(text):
+    """Parses a "key:value,key:value" string into a dict in a single pass.
+
+    Values may contain ':'. A literal ',' (or a ':' in a key) is written as
+    '\\,' ('\\:'), and a literal backslash before one of these as '\\\\'.
+    """
+    if not text:
+        raise ValueError("Expected at least one 'key:value' pair")
+    pairs = {}
+    pos = 0
+    while pos < len(text):
+        match = _PAIR_RE.match(text, pos)
+        if match is None:
+            raise ValueError(f"Expected 'key:value' at position {pos} of '{text}'")
+        key, value = (_ESCAPE_RE.sub(r'\1', part) for part in match.groups())
+        pairs[key] = value
+        pos = match.end()
+    return pairs
+
+def _add_filter_parser(subparsers):
+    """Registers the filter action's subparser."""
     parser_filter = subparsers.add_parser('filter', help='Filter rows based on a column value')
     parser_filter.add_argument('-i', '--input', required=True, help='Input Excel file')
     parser_filter.add_argument('-o', '--output', required=True, help='Output Excel file')
     parser_filter.add_argument('--column', required=True, help='Column to filter on')
     parser_filter.add_argument('--value', required=True, help='Value to filter for')
+    parser_filter.add_argument('--columns', nargs='+', help='Column(s) to keep in the output (default: all columns)')
+    parser_filter.add_argument('--engine', default='pandas', choices=['pandas', 'polars'], help='DataFrame engine used for processing')
+    parser_filter.add_argument('--streaming', action='store_true', help='Process the sheet row by row in constant memory (for very large files)')
 
-    # --- Summarize Action Parser ---
+def _add_summarize_parser(subparsers):
+    """Registers the summarize action's subparser."""
     parser_summarize = subparsers.add_parser('summarize', help='Summarize data by grouping and aggregating')
     parser_summarize.add_argument('-i', '--input', required=True, help='Input Excel file')
     parser_summarize.add_argument('-o', '--output', required=True, help='Output Excel file')
     parser_summarize.add_argument('--group-by', required=True, help='Column to group by')
     parser_summarize.add_argument('--agg-col', required=True, help='Column to aggregate')
     parser_summarize.add_argument('--agg-func', required=True, help='Aggregation function (e.g., mean, sum)')
+    parser_summarize.add_argument('--engine', default='pandas', choices=['pandas', 'polars'], help='DataFrame engine used for processing')
 
-    # --- Calculate Action Parser ---
+def _add_calculate_parser(subparsers):
+    """Registers the calculate action's subparser."""
     parser_calculate = subparsers.add_parser('calculate', help='Calculate a new column using an expression')
     parser_calculate.add_argument('-i', '--input', required=True, help='Input Excel file')
     parser_calculate.add_argument('-o', '--output', required=True, help='Output Excel file')
     parser_calculate.add_argument('--new-col', required=True, help='Name of the new column')
     parser_calculate.add_argument('--expr', required=True, help='Pandas-compatible expression (e.g., "Salary * 1.1")')
 
-    # --- Merge Action Parser ---
+def _add_merge_parser(subparsers):
+    """Registers the merge action's subparser."""
     parser_merge = subparsers.add_parser('merge', help='Merge two Excel files')
     parser_merge.add_argument('--input1', required=True, help='First input Excel file (left)')
     parser_merge.add_argument('--input2', required=True, help='Second input Excel file (right)')
     parser_merge.add_argument('-o', '--output', required=True, help='Output Excel file')
     parser_merge.add_argument('--on', required=True, help='Column to merge on')
     parser_merge.add_argument('--how', default='inner', choices=['inner', 'outer', 'left', 'right'], help='Type of merge')
+    parser_merge.add_argument('--select1', nargs='+', help='Column(s) to keep from the first file (default: all columns)')
+    parser_merge.add_argument('--select2', nargs='+', help='Column(s) to keep from the second file (default: all columns)')
+    parser_merge.add_argument('--engine', default='pandas', choices=['pandas', 'polars'], help='DataFrame engine used for processing')
 
-    # --- Sort Action Parser ---
+def _add_sort_parser(subparsers):
+    """Registers the sort action's subparser."""
     parser_sort = subparsers.add_parser('sort', help='Sort rows based on columns')
     parser_sort.add_argument('-i', '--input', required=True, help='Input Excel file')
     parser_sort.add_argument('-o', '--output', required=True, help='Output Excel file')
     parser_sort.add_argument('--by', required=True, nargs='+', help='Column(s) to sort by')
     parser_sort.add_argument('--order', default='asc', choices=['asc', 'desc'], help='Sort order')
+    parser_sort.add_argument('--columns', nargs='+', help='Column(s) to keep in the output (default: all columns)')
+    parser_sort.add_argument('--engine', default='pandas', choices=['pandas', 'polars'], help='DataFrame engine used for processing')
 
-    # --- Rename Columns Action Parser ---
+def _add_rename_parser(subparsers):
+    """Registers the rename action's subparser."""
     parser_rename = subparsers.add_parser('rename', help='Rename one or more columns')
     parser_rename.add_argument('-i', '--input', required=True, help='Input Excel file')
     parser_rename.add_argument('-o', '--output', required=True, help='Output Excel file')
-    parser_rename.add_argument('--map', required=True, help='Mapping of old to new names (e.g., "OldName:NewName,Another:New")')
+    parser_rename.add_argument('--map', required=True, help='Mapping of old to new names (e.g., "OldName:NewName,Another:New"); escape literal commas as "\\,"')
 
-    # --- Drop Duplicates Action Parser ---
+def _add_drop_duplicates_parser(subparsers):
+    """Registers the drop_duplicates action's subparser."""
     parser_drop = subparsers.add_parser('drop_duplicates', help='Remove duplicate rows')
     parser_drop.add_argument('-i', '--input', required=True, help='Input Excel file')
     parser_drop.add_argument('-o', '--output', required=True, help='Output Excel file')
     parser_drop.add_argument('--subset', nargs='+', help='Column(s) to consider for identifying duplicates')
-
-    # --- Duplicate Sheet Action Parser ---
+    parser_drop.add_argument('--engine', default='pandas', choices=['pandas', 'polars'], help='DataFrame engine used for processing')
+
+def _add_pipeline_parser(subparsers):
+    """Registers the pipeline action's subparser."""
+    parser_pipeline = subparsers.add_parser('pipeline', help='Run several actions in one pass')
+    parser_pipeline.add_argument('-i', '--input', required=True, help='Input Excel file')
+    parser_pipeline.add_argument('-o', '--output', required=True, help='Output Excel file')
+    parser_pipeline.add_argument('--ops', required=True, help='JSON list of operations (e.g., \'[{"action": "filter", "column": "Department", "value": "Sales"}]\')')
+    parser_pipeline.add_argument('--engine', default='polars', choices=['pandas', 'polars'], help='DataFrame engine used for processing')
+
+def _add_duplicate_sheet_parser(subparsers):
+    """Registers the duplicate_sheet action's subparser."""
     parser_duplicate = subparsers.add_parser('duplicate_sheet', help='Duplicate a sheet in an Excel file')
     parser_duplicate.add_argument('-i', '--input', required=True, help='Input Excel file')
     parser_duplicate.add_argument('-o', '--output', required=True, help='Output Excel file')
     parser_duplicate.add_argument('--source-sheet', required=True, help='Name of the sheet to duplicate')
     parser_duplicate.add_argument('--new-sheet-name', required=True, help='Name for the new duplicated sheet')
 
-    # --- Update Cells Action Parser ---
+def _add_update_cells_parser(subparsers):
+    """Registers the update_cells action's subparser."""
     parser_update = subparsers.add_parser('update_cells', help='Update one or more cells in a sheet')
     parser_update.add_argument('-i', '--input', required=True, help='Input Excel file')
     parser_update.add_argument('-o', '--output', required=True, help='Output Excel file')
     parser_update.add_argument('--sheet-name', required=True, help='Name of the sheet to update')
-    parser_update.add_argument('--updates', required=True, help='Cell updates in the format "A1:NewValue,B2:AnotherValue"')
+    parser_update.add_argument('--updates', required=True, help='Cell updates in the format "A1:NewValue,B2:AnotherValue"; escape literal commas as "\\,"')
 
-    # --- Data Validation Action Parser ---
+def _add_data_validation_parser(subparsers):
+    """Registers the data_validation action's subparser."""
     parser_data_validation = subparsers.add_parser('data_validation', help='Perform data cleaning and validation operations')
     parser_data_validation.add_argument('-i', '--input', required=True, help='Input Excel file')
     parser_data_validation.add_argument('-o', '--output', required=True, help='Output Excel file')
-    
+
     data_validation_subparsers = parser_data_validation.add_subparsers(dest='validation_action', required=True, help='Data validation operation')
 
     # Fill NA sub-action
     parser_fill_na = data_validation_subparsers.add_parser('fill_na', help='Fill missing values')
     parser_fill_na.add_argument('--value', required=True, help='Value to fill missing entries with')
     parser_fill_na.add_argument('--columns', nargs='+', help='Columns to fill NA values in (default: all columns)')
+    parser_fill_na.add_argument('--streaming', action='store_true', help='Process the sheet row by row in constant memory (for very large files)')
 
     # Convert Type sub-action
     parser_convert_type = data_validation_subparsers.add_parser('convert_type', help='Convert column data type')
     parser_convert_type.add_argument('--column', required=True, help='Column to convert')
     parser_convert_type.add_argument('--to-type', required=True, choices=['int', 'float', 'str', 'datetime'], help='Target data type')
 
-    # --- Chart Action Parser ---
+def _add_chart_parser(subparsers):
+    """Registers the chart action's subparser."""
     parser_chart = subparsers.add_parser('chart', help='Create a chart from data')
     parser_chart.add_argument('-i', '--input', required=True, help='Input Excel file')
     parser_chart.add_argument('-o', '--output', required=True, help='Output Excel file')
@@ -207,31 +605,84 @@ def main():
     parser_chart.add_argument('--title', default='Chart', help='Title of the chart')
     parser_chart.add_argument('--chart-title', default='Chart Sheet', help='Name of the new sheet for the chart')
 
+# Subparser factories, in the order the actions are listed in --help
+SUBCOMMANDS = {
+    'filter': _add_filter_parser,
+    'summarize': _add_summarize_parser,
+    'calculate': _add_calculate_parser,
+    'merge': _add_merge_parser,
+    'sort': _add_sort_parser,
+    'rename': _add_rename_parser,
+    'drop_duplicates': _add_drop_duplicates_parser,
+    'pipeline': _add_pipeline_parser,
+    'duplicate_sheet': _add_duplicate_sheet_parser,
+    'update_cells': _add_update_cells_parser,
+    'data_validation': _add_data_validation_parser,
+    'chart': _add_chart_parser,
+}
+
+def build_parser(action=None):
+    """Builds the argument parser.
+
+    If action names a known action, only that action's subparser is
+    registered, since it is the only one the command line can use.
+    """
+    parser = argparse.ArgumentParser(
+        description='A versatile CLI tool for automating Excel workflows.',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest='action', required=True, help='The action to perform')
+    if action in SUBCOMMANDS:
+        SUBCOMMANDS[action](subparsers)
+    else:
+        for add_subparser in SUBCOMMANDS.values():
+            add_subparser(subparsers)
+    return parser
+
+# --- Main Application ---
 
-    args = parser.parse_args()
+def run(argv=None):
+    """Runs the tool with the given arguments and returns the exit status."""
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = build_parser(argv[0] if argv else None)
+    args = parser.parse_args(argv)
 
     # --- Action Dispatch ---
     try:
         # Actions that modify the workbook directly with openpyxl
         if args.action in ['duplicate_sheet', 'update_cells', 'chart']:
+            import openpyxl
             workbook = openpyxl.load_workbook(args.input)
             if args.action == 'duplicate_sheet':
                 workbook = duplicate_sheet_data(workbook, args.source_sheet, args.new_sheet_name)
             elif args.action == 'update_cells':
-                cell_updates = dict(item.split(':', 1) for item in args.updates.split(','))
+                cell_updates = parse_key_value_pairs(args.updates)
                 workbook = update_cells_data(workbook, args.sheet_name, cell_updates)
             elif args.action == 'chart':
                 workbook = create_chart(workbook, args.sheet_name, args.chart_type, args.x_column, args.y_columns, args.title, args.chart_title)
             workbook.save(args.output)
 
-        # Actions that process data with pandas
+        # Row-by-row actions that never load the whole sheet
+        elif getattr(args, 'streaming', False):
+            if args.action == 'filter':
+                stream_filter(args.input, args.output, args.column, args.value, args.columns)
+            else:
+                stream_fill_missing(args.input, args.output, args.columns, args.value)
+
+        # Actions that process data with pandas (or Polars via --engine)
         else:
+            engine = getattr(args, 'engine', 'pandas')
             if args.action == 'merge':
-                df1 = pd.read_excel(args.input1)
-                df2 = pd.read_excel(args.input2)
-                result_df = merge_data(df1, df2, args.on, args.how)
+                # Parse both files concurrently; the readers release the GIL
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    future1 = executor.submit(read_input, args.input1, engine, _merge_columns(args.on, args.select1), cache=False)
+                    future2 = executor.submit(read_input, args.input2, engine, _merge_columns(args.on, args.select2), cache=False)
+                    df1, df2 = future1.result(), future2.result()
+                result_df = merge_data(df1, df2, args.on, args.how, args.select1, args.select2)
             else: # For all other pandas-based actions
-                df = pd.read_excel(args.input) # Read input for these actions
+                # The CLI reads each file once, so the in-memory cache would only hold a second copy
+                df = read_input(args.input, engine, _input_columns(args), cache=False)
                 if args.action == 'filter':
                     result_df = filter_data(df, args.column, args.value)
                 elif args.action == 'summarize':
@@ -241,10 +692,12 @@ def main():
                 elif args.action == 'sort':
                     result_df = sort_data(df, args.by, ascending=(args.order == 'asc'))
                 elif args.action == 'rename':
-                    rename_map = dict(item.split(':') for item in args.map.split(','))
+                    rename_map = parse_key_value_pairs(args.map)
                     result_df = rename_columns_data(df, rename_map)
                 elif args.action == 'drop_duplicates':
                     result_df = drop_duplicates_data(df, subset=args.subset)
+                elif args.action == 'pipeline':
+                    result_df = run_pipeline(df, json.loads(args.ops))
                 elif args.action == 'data_validation':
                     if args.validation_action == 'fill_na':
                         result_df = fill_missing_values(df, args.columns, args.value)
@@ -253,12 +706,19 @@ def main():
                     else:
                         result_df = df # Should not happen due to required=True on subparsers
             
-            result_df.to_excel(args.output, index=False)
+            write_output(result_df, args.output)
 
         print(f"Action '{args.action}' completed successfully. Output saved to {args.output}")
+        # Machine-readable last line for scripts that check the outcome
+        print(f"OK:{args.action}")
+        return 0
 
     except Exception as e:
         print(f"An error occurred: {e}")
+        return 1
+
+def main():
+    sys.exit(run())
 
 if __name__ == '__main__':
     main()
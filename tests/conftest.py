@@ -0,0 +1,50 @@
+import shutil
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pytest
+# main imports these lazily; importing them at collection keeps their
+# one-off import cost out of the first test that needs them
+import openpyxl.chart  # noqa: F401
+import polars  # noqa: F401
+
+InputFiles = namedtuple('InputFiles', ['employees', 'departments'])
+
+@pytest.fixture(scope="session", autouse=True)
+def input_files(tmp_path_factory):
+    """Writes the input Excel files once per test session.
+
+    The inputs (and their Parquet caches) live in the session's temporary
+    directory, one per pytest-xdist worker, and each test writes its output
+    to its own ``tmp_path``, so tests can run in parallel. The first
+    DataFrame action to read an input stores it as a Parquet cache per
+    engine, which later DataFrame actions in the same worker load instead
+    of parsing the workbook again. The openpyxl-based actions
+    (update_cells, duplicate_sheet, chart and the --streaming modes) still
+    parse the workbook on every run.
+    """
+    data_dir = tmp_path_factory.mktemp("data")
+
+    # Main input file for general tests and data_validation
+    # Typed columns, so to_excel writes from typed buffers rather than boxed
+    # Python objects, and Rating keeps integer values next to its missing one
+    df = pd.DataFrame({
+        'Name': pd.array(['Alice', 'Bob', 'Charlie', 'David', 'Eva', 'Frank'], dtype="string[pyarrow]"),
+        'Department': pd.array(['Sales', 'Marketing', 'Engineering', 'Sales', 'Engineering', None], dtype="string[pyarrow]"),
+        'Salary': np.array([70000, 65000, 90000, 72000, 95000, 80000], dtype=np.int64),
+        'Rating': pd.array([5, 4, 5, 3, 4, None], dtype="Int64"),
+    })
+    df.to_excel(data_dir / "test_input.xlsx", index=False, sheet_name='Employees', engine='xlsxwriter')
+
+    # Second input file for merge action
+    data2 = {'Department': ['Sales', 'Marketing', 'Engineering'],
+             'Location': ['New York', 'London', 'Paris']}
+    df2 = pd.DataFrame(data2, dtype="string[pyarrow]")
+    df2.to_excel(data_dir / "test_input2.xlsx", index=False, engine='xlsxwriter')
+
+    yield InputFiles(employees=str(data_dir / "test_input.xlsx"), departments=str(data_dir / "test_input2.xlsx"))
+
+    # Inputs and their Parquet caches are removed in one go; outputs of passing
+    # tests are removed by pytest (tmp_path_retention_policy in pytest.ini)
+    shutil.rmtree(data_dir, ignore_errors=True)
@@ -1,262 +1,685 @@
+import datetime
+import functools
+import glob
+import io
 import os
-import pandas as pd
 import subprocess
+import sys
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+import pandas as pd
+import pytest
 import openpyxl
-import shlex
-import numpy as np
-
-# Define file paths
-INPUT_FILE = "test_input.xlsx"
-INPUT_FILE_2 = "test_input2.xlsx"
-OUTPUT_FILE = "test_output.xlsx"
-
-def setup_module(module):
-    """Set up dummy Excel files for testing."""
-    # Main input file for general tests and data_validation
-    data = {'Name': ['Alice', 'Bob', 'Charlie', 'David', 'Eva', 'Frank'],
-            'Department': ['Sales', 'Marketing', 'Engineering', 'Sales', 'Engineering', np.nan],
-            'Salary': [70000, 65000, 90000, 72000, 95000, 80000],
-            'Rating': [5, 4, 5, 3, 4, np.nan]}
-    df = pd.DataFrame(data, dtype=object) # Create DataFrame with object dtype to prevent premature type inference
-    df.to_excel(INPUT_FILE, index=False, sheet_name='Employees')
-
-    # Second input file for merge action
-    data2 = {'Department': ['Sales', 'Marketing', 'Engineering'],
-             'Location': ['New York', 'London', 'Paris']}
-    df2 = pd.DataFrame(data2)
-    df2.to_excel(INPUT_FILE_2, index=False)
-
-def teardown_module(module):
-    """Clean up dummy Excel files after testing."""
-    files_to_remove = [INPUT_FILE, INPUT_FILE_2, OUTPUT_FILE, "merged_output.xlsx", "sorted_output.xlsx",
-                       "renamed_output.xlsx", "deduplicated_output.xlsx", "duplicated_sheet_output.xlsx",
-                       "updated_cells_output.xlsx", "summarized_output.xlsx", "calculated_output.xlsx",
-                       "sample_data.xlsx", "sales_report.xlsx", "department_salaries.xlsx", "bonus_data.xlsx",
-                       "sample_data_with_copy.xlsx", "final_output.xlsx",
-                       "filled_na_output.xlsx", "converted_type_output.xlsx"]
-    for f in files_to_remove:
-        if os.path.exists(f):
-            os.remove(f)
+import json
+from collections import namedtuple
+from contextlib import redirect_stdout
+
+import main
+
+# Read only what an assertion looks at, without openpyxl's editable cell model
+_READ_KW = {"engine": "openpyxl", "engine_kwargs": {"read_only": True, "data_only": True},
+            "dtype_backend": "pyarrow"}
+
+# Namespace of the SpreadsheetML elements in xl/workbook.xml
+_XLSX_NS = {"main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+# Mirrors the fields of subprocess.CompletedProcess that the tests check, plus
+# the action named by main's final "OK:<action>" line (None if it is missing)
+Result = namedtuple('Result', ['returncode', 'stdout', 'stderr', 'ok_action'])
+
+def _read_cells(path, sheet=None, max_row=None):
+    """Returns a sheet's cell values as a list of row tuples, header row first."""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        return list(worksheet.iter_rows(max_row=max_row, values_only=True))
+    finally:
+        workbook.close()
+
+def _sheet_names(path):
+    """Returns a workbook's sheet names, read from xl/workbook.xml without loading the sheets."""
+    with zipfile.ZipFile(path) as archive:
+        root = ET.fromstring(archive.read("xl/workbook.xml"))
+    return [sheet.get("name") for sheet in root.iterfind("main:sheets/main:sheet", _XLSX_NS)]
+
+def _read_columns(path, sheet=None, max_row=None):
+    """Returns a sheet's data as a dict mapping each header to its column values."""
+    header, *rows = _read_cells(path, sheet, max_row)
+    return {name: [row[i] for row in rows] for i, name in enumerate(header)}
+
+@functools.lru_cache(maxsize=None)
+def _flag(key):
+    """Returns the command-line flag for a keyword argument name, e.g. group_by -> --group-by."""
+    return "--" + key.replace("_", "-")
 
 def run_cli_command(action, input_file, output_file, sub_action=None, **kwargs):
-    """Helper function to run the main.py script."""
-    command = ["python3", "main.py", action]
-    
+    """Helper function to run the CLI in-process and capture its output."""
+    argv = [action]
+
     # Place -i and -o arguments right after the main action, before any sub_action
     if action == 'merge':
-        command.extend(["--input1", shlex.quote(input_file), "--input2", shlex.quote(kwargs.pop('input2')), "-o", shlex.quote(output_file)])
+        argv.extend(["--input1", input_file, "--input2", kwargs.pop('input2'), "-o", str(output_file)])
     else:
-        command.extend(["-i", shlex.quote(input_file), "-o", shlex.quote(output_file)])
+        argv.extend(["-i", input_file, "-o", str(output_file)])
 
     if sub_action:
-        command.append(sub_action)
+        argv.append(sub_action)
 
     for key, value in kwargs.items():
+        flag = _flag(key)
         # Special handling for list arguments like --by or --subset
         if isinstance(value, list):
-            for item in value:
-                command.extend([f"--{key.replace("_", "-")}", shlex.quote(str(item))])
+            argv.append(flag)
+            argv.extend(str(item) for item in value)
+        # Boolean flags like --streaming take no value
+        elif value is True:
+            argv.append(flag)
         else:
-            command.extend([f"--{key.replace("_", "-")}", shlex.quote(str(value))])
-    
-    # Run the command within the virtual environment
-    full_command = f"source venv/bin/activate && {' '.join(command)}"
-    result = subprocess.run(["bash", "-c", full_command], capture_output=True, text=True, check=True)
-    return result
-
-def test_filter_action():
+            argv += (flag, str(value))
+
+    # Run main.py in this process instead of spawning an interpreter per test
+    with io.StringIO() as buffer, redirect_stdout(buffer):
+        returncode = main.run(argv)
+        stdout = buffer.getvalue()
+    last_line = stdout.rstrip("\n").rpartition("\n")[2]
+    ok_action = last_line[3:] if last_line.startswith("OK:") else None
+    return Result(returncode=returncode, stdout=stdout, stderr="", ok_action=ok_action)
+
+def test_filter_action(input_files, tmp_path):
     """Test the filter action."""
+    output_file = tmp_path / "filtered_output.xlsx"
     result = run_cli_command(
         "filter",
-        INPUT_FILE,
-        OUTPUT_FILE,
+        input_files.employees,
+        output_file,
         column="Department",
         value="Sales"
     )
     assert result.returncode == 0
-    assert "Action 'filter' completed successfully" in result.stdout
-
-    df_output = pd.read_excel(OUTPUT_FILE)
-    assert len(df_output) == 2
-    assert "Alice" in df_output['Name'].values
-    assert "David" in df_output['Name'].values
-    assert "Charlie" not in df_output['Name'].values
-
-def test_summarize_action():
+    assert result.ok_action == "filter"
+
+    rows = _read_cells(output_file)
+    names = {row[0] for row in rows[1:]}
+    assert len(rows) == 3
+    assert "Alice" in names
+    assert "David" in names
+    assert "Charlie" not in names
+
+def test_cli_entry_point(input_files, tmp_path):
+    """Test running main.py as a script, as a user would."""
+    output_file = tmp_path / "script_filtered_output.xlsx"
+    # An argv list is executed directly, without a shell or any quoting
+    result = subprocess.run(
+        [sys.executable, main.__file__, "filter", "-i", input_files.employees, "-o", str(output_file),
+         "--column", "Department", "--value", "Sales"],
+        capture_output=True,
+        check=True
+    )
+    # Compare raw bytes rather than decoding the whole output with text=True
+    assert b"Action 'filter' completed successfully" in result.stdout
+    assert result.stdout.endswith(b"OK:filter\n")
+    assert len(_read_cells(output_file)) == 3
+
+def _input_caches(path):
+    """Returns the Parquet cache files main has written for an input file."""
+    directory, name = os.path.split(path)
+    return sorted(glob.glob(os.path.join(glob.escape(directory), f".{glob.escape(name)}.*.parquet")))
+
+def test_input_cache_is_per_engine(tmp_path):
+    """Test that a Polars read cached first does not change a later pandas result."""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['Name', 'Code', 'Hired'])
+    sheet.append(['Bob', 1, datetime.datetime(2020, 1, 1)])
+    sheet.append(['Alice', 'x', datetime.datetime(2021, 6, 15)])
+    sheet.append(['Carol', 3, datetime.datetime(2019, 3, 2)])
+    for name in ("mixed_input.xlsx", "fresh_input.xlsx"):
+        workbook.save(tmp_path / name)
+    mixed_input, fresh_input = str(tmp_path / "mixed_input.xlsx"), str(tmp_path / "fresh_input.xlsx")
+
+    assert run_cli_command("sort", mixed_input, tmp_path / "polars_output.xlsx", by=["Name"], engine="polars").returncode == 0
+    assert run_cli_command("sort", mixed_input, tmp_path / "cached_output.xlsx", by=["Name"]).returncode == 0
+    assert run_cli_command("sort", fresh_input, tmp_path / "fresh_output.xlsx", by=["Name"]).returncode == 0
+
+    assert _read_cells(tmp_path / "cached_output.xlsx") == _read_cells(tmp_path / "fresh_output.xlsx")
+
+def test_read_input_survives_deleted_cache(tmp_path):
+    """Test that a cached Polars read keeps working after its Parquet file is deleted."""
+    input_file = str(tmp_path / "input.xlsx")
+    pd.DataFrame({'Name': ['Bob', 'Alice']}).to_excel(input_file, index=False)
+    main.read_input(input_file, 'polars').collect()  # parses the sheet and writes the Parquet cache
+    main._read_input_cached.cache_clear()  # as in a new process
+    main.read_input(input_file, 'polars').collect()  # served from the Parquet cache
+    for cache in _input_caches(input_file):
+        os.remove(cache)
+
+    assert main.read_input(input_file, 'polars').collect()['Name'].to_list() == ['Bob', 'Alice']
+
+def test_cli_does_not_keep_inputs_in_memory(input_files, tmp_path):
+    """Test that CLI runs bypass read_input's in-memory cache, which only serves library callers."""
+    main._read_input_cached.cache_clear()
+    result = run_cli_command("sort", input_files.employees, tmp_path / "sorted_output.xlsx", by=["Salary"])
+    assert result.ok_action == "sort"
+    assert main._read_input_cached.cache_info().currsize == 0
+
+@pytest.mark.parametrize("rewrite", [False, True], ids=["touched", "rewritten"])
+def test_input_cache_invalidated_when_input_changes(tmp_path, rewrite):
+    """Test that touching or rewriting the input replaces its Parquet cache."""
+    input_file = str(tmp_path / "input.xlsx")
+    pd.DataFrame({'Name': ['Bob', 'Alice']}).to_excel(input_file, index=False)
+    assert run_cli_command("sort", input_file, tmp_path / "first_output.xlsx", by=["Name"]).returncode == 0
+    first_caches = _input_caches(input_file)
+    assert len(first_caches) == 1
+
+    if rewrite:
+        pd.DataFrame({'Name': ['Dave', 'Carol', 'Eve']}).to_excel(input_file, index=False)
+    # Set the modification time explicitly so the change is visible on coarse-grained file systems
+    stat = os.stat(input_file)
+    os.utime(input_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    output_file = tmp_path / "second_output.xlsx"
+    assert run_cli_command("sort", input_file, output_file, by=["Name"]).returncode == 0
+
+    caches = _input_caches(input_file)
+    assert len(caches) == 1
+    assert caches != first_caches
+    expected = ['Carol', 'Dave', 'Eve'] if rewrite else ['Alice', 'Bob']
+    assert _read_columns(output_file)['Name'] == expected
+
+def test_summarize_action(input_files, tmp_path):
     """Test the summarize action."""
+    output_file = tmp_path / "summarized_output.xlsx"
     result = run_cli_command(
         "summarize",
-        INPUT_FILE,
-        "summarized_output.xlsx",
+        input_files.employees,
+        output_file,
         group_by="Department",
         agg_col="Salary",
         agg_func="mean"
     )
     assert result.returncode == 0
-    assert "Action 'summarize' completed successfully" in result.stdout
+    assert result.ok_action == "summarize"
 
-    df_output = pd.read_excel("summarized_output.xlsx")
+    df_output = pd.read_excel(output_file, usecols=["Department", "Salary"], nrows=4, **_READ_KW)
     assert len(df_output) == 3
     assert df_output[df_output['Department'] == 'Sales']['Salary'].iloc[0] == 71000.0
 
-def test_calculate_action():
+def test_filter_data_object_column():
+    """Test filter_data on an object column, for a present and an absent value."""
+    df = pd.DataFrame({'Department': ['Sales', 'HR', None, 'Sales'], 'Salary': [1, 2, 3, 4]},
+                      index=[10, 11, 12, 13]).astype({'Department': object})
+    assert df['Department'].dtype == object
+
+    matched = main.filter_data(df, 'Department', 'Sales')
+    assert list(matched.index) == [10, 13]
+    assert list(matched['Salary']) == [1, 4]
+
+    missing = main.filter_data(df, 'Department', 'Marketing')
+    assert missing.empty
+    assert list(missing.columns) == ['Department', 'Salary']
+
+def test_filter_action_streaming(input_files, tmp_path):
+    """Test the filter action in streaming mode."""
+    output_file = tmp_path / "streamed_filtered_output.xlsx"
+    result = run_cli_command(
+        "filter",
+        input_files.employees,
+        output_file,
+        column="Department",
+        value="Sales",
+        streaming=True
+    )
+    assert result.returncode == 0
+    assert result.ok_action == "filter"
+
+    output = _read_columns(output_file)
+    assert list(output) == ['Name', 'Department', 'Salary', 'Rating']
+    assert output['Name'] == ['Alice', 'David']
+    assert output['Salary'] == [70000, 72000]
+
+def test_stream_sheet_error_leaves_no_files(input_files, tmp_path, monkeypatch):
+    """Test that an error while streaming rows leaves neither output nor xlsxwriter temporary files."""
+    output_file = tmp_path / "failed_stream_output.xlsx"
+    # xlsxwriter's constant_memory mode buffers each worksheet's rows in a temporary file
+    temp_dir = tmp_path / "tmp"
+    temp_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(temp_dir))
+
+    def process(header, rows):
+        def failing_rows():
+            yield next(rows)
+            raise ValueError("bad row")
+        return header, failing_rows()
+
+    with pytest.raises(ValueError, match="bad row"):
+        main._stream_sheet(input_files.employees, str(output_file), process)
+    assert not output_file.exists()
+    assert not list(temp_dir.iterdir())
+
+def test_filter_action_selected_columns(input_files, tmp_path):
+    """Test the filter action reading only the selected columns."""
+    output_file = tmp_path / "filtered_columns_output.xlsx"
+    result = run_cli_command(
+        "filter",
+        input_files.employees,
+        output_file,
+        column="Department",
+        value="Sales",
+        columns=["Name"]
+    )
+    assert result.returncode == 0
+    assert result.ok_action == "filter"
+
+    output = _read_columns(output_file)
+    assert list(output) == ['Name', 'Department']
+    assert output['Name'] == ['Alice', 'David']
+
+def test_filter_action_polars_engine(input_files, tmp_path):
+    """Test the filter action with the polars engine."""
+    output_file = tmp_path / "polars_filtered_output.xlsx"
+    result = run_cli_command(
+        "filter",
+        input_files.employees,
+        output_file,
+        column="Department",
+        value="Sales",
+        engine="polars"
+    )
+    assert result.returncode == 0
+    assert result.ok_action == "filter"
+
+    output = _read_columns(output_file)
+    assert output['Name'] == ['Alice', 'David']
+
+def test_summarize_action_polars_engine(input_files, tmp_path):
+    """Test the summarize action with the polars engine."""
+    output_file = tmp_path / "polars_summarized_output.xlsx"
+    result = run_cli_command(
+        "summarize",
+        input_files.employees,
+        output_file,
+        group_by="Department",
+        agg_col="Salary",
+        agg_func="mean",
+        engine="polars"
+    )
+    assert result.returncode == 0
+    assert result.ok_action == "summarize"
+
+    output = _read_columns(output_file)
+    assert output['Department'] == ['Engineering', 'Marketing', 'Sales']
+    assert output['Salary'][2] == 71000.0
+
+@pytest.mark.parametrize("agg_func", ["size", "nunique", "prod"])
+def test_summarize_action_polars_engine_matches_pandas(input_files, tmp_path, agg_func):
+    """Test that pandas aggregation names give the same result with the polars engine."""
+    outputs = {}
+    for engine in ("pandas", "polars"):
+        outputs[engine] = tmp_path / f"{engine}_summarized_output.xlsx"
+        result = run_cli_command(
+            "summarize",
+            input_files.employees,
+            outputs[engine],
+            group_by="Department",
+            agg_col="Rating",
+            agg_func=agg_func,
+            engine=engine
+        )
+        assert result.returncode == 0
+        assert result.ok_action == "summarize"
+
+    assert _read_cells(outputs["polars"]) == _read_cells(outputs["pandas"])
+
+def test_polars_engine_output_matches_pandas(input_files, tmp_path):
+    """Test that --engine polars writes plain cells like pandas, not an Excel table."""
+    outputs = {}
+    for engine in ("pandas", "polars"):
+        outputs[engine] = tmp_path / f"{engine}_summarized_output.xlsx"
+        result = run_cli_command(
+            "summarize",
+            input_files.employees,
+            outputs[engine],
+            group_by="Department",
+            agg_col="Salary",
+            agg_func="mean",
+            engine=engine
+        )
+        assert result.ok_action == "summarize"
+
+    for engine, output_file in outputs.items():
+        with zipfile.ZipFile(output_file) as archive:
+            assert not [name for name in archive.namelist() if name.startswith("xl/tables/")], engine
+    workbooks = {engine: openpyxl.load_workbook(output_file) for engine, output_file in outputs.items()}
+    sheets = {engine: workbook.active for engine, workbook in workbooks.items()}
+    assert sheets["polars"].auto_filter.ref == sheets["pandas"].auto_filter.ref
+    cells = {engine: [(cell.value, cell.number_format) for row in sheet.iter_rows() for cell in row]
+             for engine, sheet in sheets.items()}
+    assert cells["polars"] == cells["pandas"]
+
+def test_summarize_action_polars_engine_unsupported_agg_func(input_files, tmp_path):
+    """Test that the polars engine rejects aggregations it has no equivalent for."""
+    result = run_cli_command(
+        "summarize",
+        input_files.employees,
+        tmp_path / "unsupported_output.xlsx",
+        group_by="Department",
+        agg_col="Salary",
+        agg_func="sem",
+        engine="polars"
+    )
+    assert result.returncode == 1
+    assert "Unsupported aggregation for the polars engine: sem" in result.stdout
+
+def test_filter_action_polars_engine_numeric_column(input_files, tmp_path):
+    """Test the polars engine filtering a numeric column by a value given as text."""
+    output_file = tmp_path / "polars_filtered_numeric_output.xlsx"
+    result = run_cli_command(
+        "filter",
+        input_files.employees,
+        output_file,
+        column="Salary",
+        value="72000",
+        engine="polars"
+    )
+    assert result.returncode == 0
+    assert result.ok_action == "filter"
+
+    output = _read_columns(output_file)
+    assert output['Name'] == ['David']
+
+def test_calculate_action(input_files, tmp_path):
     """Test the calculate action."""
+    output_file = tmp_path / "calculated_output.xlsx"
     result = run_cli_command(
         "calculate",
-        INPUT_FILE,
-        "calculated_output.xlsx",
+        input_files.employees,
+        output_file,
         new_col="Bonus",
         expr="Salary * 0.1"
     )
     assert result.returncode == 0
-    assert "Action 'calculate' completed successfully" in result.stdout
+    assert result.ok_action == "calculate"
 
-    df_output = pd.read_excel("calculated_output.xlsx")
+    df_output = pd.read_excel(output_file, usecols=["Bonus"], nrows=1, **_READ_KW)
     assert 'Bonus' in df_output.columns
     assert df_output['Bonus'].iloc[0] == 7000.0
 
-def test_merge_action():
+def test_merge_action(input_files, tmp_path):
     """Test the merge action."""
+    output_file = tmp_path / "merged_output.xlsx"
     result = run_cli_command(
         "merge",
-        INPUT_FILE,
-        "merged_output.xlsx",
-        input2=INPUT_FILE_2,
+        input_files.employees,
+        output_file,
+        input2=input_files.departments,
         on="Department",
         how="inner"
     )
     assert result.returncode == 0
-    assert "Action 'merge' completed successfully" in result.stdout
+    assert result.ok_action == "merge"
+
+    header, *rows = _read_cells(output_file)
+    assert 'Location' in header
+    assert len(rows) == 5
+
+def test_merge_action_selected_columns(input_files, tmp_path):
+    """Test the merge action keeping only selected columns of the first file."""
+    output_file = tmp_path / "merged_selected_output.xlsx"
+    result = run_cli_command(
+        "merge",
+        input_files.employees,
+        output_file,
+        input2=input_files.departments,
+        on="Department",
+        select1=["Name"]
+    )
+    assert result.returncode == 0
+    assert result.ok_action == "merge"
 
-    df_output = pd.read_excel("merged_output.xlsx")
-    assert 'Location' in df_output.columns
-    assert len(df_output) == 5
+    header, *rows = _read_cells(output_file)
+    assert header == ('Department', 'Name', 'Location')
+    assert len(rows) == 5
 
-def test_sort_action():
+def test_merge_action_polars_engine(input_files, tmp_path):
+    """Test the merge action with the polars engine."""
+    output_file = tmp_path / "polars_merged_output.xlsx"
+    result = run_cli_command(
+        "merge",
+        input_files.employees,
+        output_file,
+        input2=input_files.departments,
+        on="Department",
+        how="outer",
+        engine="polars"
+    )
+    assert result.returncode == 0
+    assert result.ok_action == "merge"
+
+    header, *rows = _read_cells(output_file)
+    assert 'Location' in header
+    assert len(rows) == 6
+
+def test_sort_action(input_files, tmp_path):
     """Test the sort action."""
+    output_file = tmp_path / "sorted_output.xlsx"
     result = run_cli_command(
         "sort",
-        INPUT_FILE,
-        "sorted_output.xlsx",
+        input_files.employees,
+        output_file,
         by=["Salary"],
         order="desc"
     )
     assert result.returncode == 0
-    assert "Action 'sort' completed successfully" in result.stdout
+    assert result.ok_action == "sort"
 
-    df_output = pd.read_excel("sorted_output.xlsx")
+    df_output = pd.read_excel(output_file, usecols=["Salary"], **_READ_KW)
     assert df_output['Salary'].iloc[0] == 95000
     assert df_output['Salary'].iloc[-1] == 65000
 
-def test_rename_action():
+def test_sort_data_large_frame_keeps_index(large_frame_polars):
+    """Test that sorting a large frame with Polars keeps the caller's index labels."""
+    df = pd.DataFrame({'Name': ['Dan', 'Ann', 'Cy', 'Bo'], 'Salary': [4, 1, 3, 2]}, index=[12, 10, 13, 11])
+    assert main._large_frame_to_polars(df) is not None
+
+    for ascending in (True, False):
+        result = main.sort_data(df, ['Salary'], ascending=ascending)
+        expected = df.sort_values(by=['Salary'], ascending=ascending)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False)
+
+def test_rename_action(input_files, tmp_path):
     """Test the rename action."""
+    output_file = tmp_path / "renamed_output.xlsx"
     result = run_cli_command(
         "rename",
-        INPUT_FILE,
-        "renamed_output.xlsx",
+        input_files.employees,
+        output_file,
         map="Name:Full Name,Department:Dept"
     )
     assert result.returncode == 0
-    assert "Action 'rename' completed successfully" in result.stdout
+    assert result.ok_action == "rename"
 
-    df_output = pd.read_excel("renamed_output.xlsx")
+    df_output = pd.read_excel(output_file, nrows=0, **_READ_KW)
     assert 'Full Name' in df_output.columns
     assert 'Dept' in df_output.columns
     assert 'Name' not in df_output.columns
     assert 'Department' not in df_output.columns
 
-def test_drop_duplicates_action():
+def test_drop_duplicates_action(input_files, tmp_path):
     """Test the drop_duplicates action."""
+    output_file = tmp_path / "deduplicated_output.xlsx"
     result = run_cli_command(
         "drop_duplicates",
-        INPUT_FILE,
-        "deduplicated_output.xlsx",
+        input_files.employees,
+        output_file,
         subset=["Department"]
     )
     assert result.returncode == 0
-    assert "Action 'drop_duplicates' completed successfully" in result.stdout
+    assert result.ok_action == "drop_duplicates"
 
-    df_output = pd.read_excel("deduplicated_output.xlsx")
+    df_output = pd.read_excel(output_file, usecols=["Department"], **_READ_KW)
     assert len(df_output) == 4 # Sales, Marketing, Engineering, None
 
-def test_duplicate_sheet_action():
+@pytest.fixture
+def large_frame_polars(monkeypatch):
+    """Makes every frame count as large, so heavy pandas actions are handed to Polars."""
+    monkeypatch.setattr(main, "POLARS_ROW_THRESHOLD", 0)
+    monkeypatch.setattr(main.os, "cpu_count", lambda: 4)
+
+def test_drop_duplicates_data_large_frame_keeps_index(large_frame_polars):
+    """Test that deduplicating a large frame with Polars keeps the caller's index labels."""
+    df = pd.DataFrame({'Department': ['Sales', 'HR', 'Sales', 'IT', 'HR'], 'Salary': [1, 2, 3, 4, 5]},
+                      index=[10, 13, 11, 12, 14])
+    assert main._large_frame_to_polars(df) is not None
+
+    result = main.drop_duplicates_data(df, subset=['Department'])
+    expected = df.drop_duplicates(subset=['Department'])
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False)
+    assert list(main.drop_duplicates_data(df).index) == [10, 13, 11, 12, 14]
+
+def test_pipeline_action(input_files, tmp_path):
+    """Test the pipeline action chaining filter, sort and select."""
+    output_file = tmp_path / "pipeline_output.xlsx"
+    ops = [
+        {"action": "filter", "column": "Department", "value": "Engineering"},
+        {"action": "sort", "by": ["Salary"], "order": "desc"},
+        {"action": "select", "columns": ["Name", "Salary"]},
+    ]
+    result = run_cli_command(
+        "pipeline",
+        input_files.employees,
+        output_file,
+        ops=json.dumps(ops)
+    )
+    assert result.returncode == 0
+    assert result.ok_action == "pipeline"
+
+    output = _read_columns(output_file)
+    assert list(output) == ['Name', 'Salary']
+    assert output['Name'] == ['Eva', 'Charlie']
+
+def test_duplicate_sheet_action(input_files, tmp_path):
     """Test the duplicate_sheet action."""
+    output_file = tmp_path / "duplicated_sheet_output.xlsx"
     result = run_cli_command(
         "duplicate_sheet",
-        INPUT_FILE,
-        "duplicated_sheet_output.xlsx",
+        input_files.employees,
+        output_file,
         source_sheet="Employees",
         new_sheet_name="Employees_Copy"
     )
     assert result.returncode == 0
-    assert "Action 'duplicate_sheet' completed successfully" in result.stdout
+    assert result.ok_action == "duplicate_sheet"
 
-    workbook = openpyxl.load_workbook("duplicated_sheet_output.xlsx")
-    assert "Employees" in workbook.sheetnames
-    assert "Employees_Copy" in workbook.sheetnames
+    sheet_names = _sheet_names(output_file)
+    assert "Employees" in sheet_names
+    assert "Employees_Copy" in sheet_names
 
-def test_update_cells_action():
+def test_update_cells_action(input_files, tmp_path):
     """Test the update_cells action."""
+    output_file = tmp_path / "updated_cells_output.xlsx"
     result = run_cli_command(
         "update_cells",
-        INPUT_FILE,
-        "updated_cells_output.xlsx",
+        input_files.employees,
+        output_file,
         sheet_name="Employees",
         updates="A1:NewHeaderA,B1:NewHeaderB"
     )
     assert result.returncode == 0
-    assert "Action 'update_cells' completed successfully" in result.stdout
+    assert result.ok_action == "update_cells"
 
-    workbook = openpyxl.load_workbook("updated_cells_output.xlsx")
-    sheet = workbook['Employees']
-    assert sheet['A1'].value == 'NewHeaderA'
-    assert sheet['B1'].value == 'NewHeaderB'
+    first_row = _read_cells(output_file, 'Employees', max_row=1)[0]
+    assert first_row[0] == 'NewHeaderA'
+    assert first_row[1] == 'NewHeaderB'
 
-def test_data_validation_fill_na_all_columns():
-    """Test data_validation fill_na for all columns."""
+def test_update_cells_action_escaped_comma(input_files, tmp_path):
+    """Test the update_cells action with values containing commas and colons."""
+    output_file = tmp_path / "updated_cells_escaped_output.xlsx"
     result = run_cli_command(
-        "data_validation",
-        INPUT_FILE,
-        "filled_na_output.xlsx",
-        sub_action="fill_na",
-        value="NIL"
+        "update_cells",
+        input_files.employees,
+        output_file,
+        sheet_name="Employees",
+        updates="A2:Smith\\, John,B2:Status: Final"
+    )
+    assert result.returncode == 0
+    assert result.ok_action == "update_cells"
+
+    second_row = _read_cells(output_file, 'Employees', max_row=2)[1]
+    assert second_row[0] == 'Smith, John'
+    assert second_row[1] == 'Status: Final'
+
+def test_update_cells_action_windows_path(input_files, tmp_path):
+    """Test the update_cells action keeping backslashes that are not escapes."""
+    output_file = tmp_path / "updated_cells_path_output.xlsx"
+    result = run_cli_command(
+        "update_cells",
+        input_files.employees,
+        output_file,
+        sheet_name="Employees",
+        updates="A2:C:\\temp\\new,B2:a\\b"
     )
     assert result.returncode == 0
-    assert "Action 'data_validation' completed successfully" in result.stdout
+    assert result.ok_action == "update_cells"
 
-    df_output = pd.read_excel("filled_na_output.xlsx", dtype={'Department': str})
-    assert df_output['Department'].iloc[5] == 'NIL'
+    second_row = _read_cells(output_file, 'Employees', max_row=2)[1]
+    assert second_row[0] == 'C:\\temp\\new'
+    assert second_row[1] == 'a\\b'
 
-def test_data_validation_fill_na_specific_column():
-    """Test data_validation fill_na for a specific column."""
+def test_update_cells_action_empty_updates(input_files, tmp_path):
+    """Test that update_cells rejects an empty list of updates."""
+    result = run_cli_command(
+        "update_cells",
+        input_files.employees,
+        tmp_path / "updated_cells_empty_output.xlsx",
+        sheet_name="Employees",
+        updates=""
+    )
+    assert result.returncode == 1
+    assert "Expected at least one 'key:value' pair" in result.stdout
+
+@pytest.mark.parametrize(
+    "value, options",
+    [
+        ("NIL", {}),
+        ("Unknown", {"columns": ["Department"]}),
+        ("Unknown", {"columns": ["Department"], "streaming": True}),
+    ],
+    ids=["all_columns", "specific_column", "streaming"]
+)
+def test_data_validation_fill_na(input_files, tmp_path, value, options):
+    """Test data_validation fill_na for all columns, one column, and in streaming mode."""
+    output_file = tmp_path / "filled_na_output.xlsx"
     result = run_cli_command(
         "data_validation",
-        INPUT_FILE,
-        "filled_na_specific_output.xlsx",
+        input_files.employees,
+        output_file,
         sub_action="fill_na",
-        value="Unknown",
-        columns=["Department"]
+        value=value,
+        **options
     )
     assert result.returncode == 0
-    assert "Action 'data_validation' completed successfully" in result.stdout
+    assert result.ok_action == "data_validation"
 
-    df_output = pd.read_excel("filled_na_specific_output.xlsx")
-    assert df_output['Department'].iloc[5] == 'Unknown'
+    output = _read_columns(output_file)
+    assert output['Department'][5] == value
+    if "columns" in options:
+        assert output['Rating'][5] is None
 
-def test_data_validation_convert_type():
+def test_data_validation_convert_type(input_files, tmp_path):
     """Test data_validation convert_type action."""
+    output_file = tmp_path / "converted_type_output.xlsx"
     result = run_cli_command(
         "data_validation",
-        INPUT_FILE,
-        "converted_type_output.xlsx",
+        input_files.employees,
+        output_file,
         sub_action="convert_type",
         column="Rating",
         to_type="int"
     )
     assert result.returncode == 0
-    assert "Action 'data_validation' completed successfully" in result.stdout
+    assert result.ok_action == "data_validation"
 
-    df_output = pd.read_excel("converted_type_output.xlsx")
+    df_output = pd.read_excel(output_file, usecols=["Rating"], engine="openpyxl", engine_kwargs=_READ_KW["engine_kwargs"])
     # After reading from Excel, pandas will use float64 for columns with missing values (NaN)
     # even if they were Int64 before writing. This is expected behavior.
     assert str(df_output['Rating'].dtype) == 'float64'
@@ -265,12 +688,32 @@ def test_data_validation_convert_type():
     assert df_output['Rating'].iloc[0] == 5.0
     assert df_output['Rating'].iloc[1] == 4.0
 
-def test_chart_action():
+@pytest.mark.parametrize(
+    "data_type, values, expected",
+    [
+        ("str", pd.array([1, None, 3], dtype="Int64"), ['1', None, '3']),
+        ("datetime", ['2024-01-02', None, 'not a date'], [pd.Timestamp('2024-01-02'), None, None]),
+    ],
+    ids=["str", "datetime"]
+)
+@pytest.mark.parametrize("has_pyarrow", [True, False], ids=["arrow", "numpy"])
+def test_convert_column_type_keeps_missing_values(monkeypatch, data_type, values, expected, has_pyarrow):
+    """Test that converting to str or datetime leaves missing values missing instead of e.g. 'nan'."""
+    if not has_pyarrow:
+        find_spec = main.importlib.util.find_spec
+        monkeypatch.setattr(main.importlib.util, "find_spec",
+                            lambda name, *args: None if name == "pyarrow" else find_spec(name, *args))
+    df = main.convert_column_type(pd.DataFrame({'Value': values}), 'Value', data_type)
+    converted = df['Value'].tolist()
+    assert [None if pd.isna(value) else value for value in converted] == expected
+
+def test_chart_action(input_files, tmp_path):
     """Test the chart action."""
+    output_file = tmp_path / "chart_output.xlsx"
     result = run_cli_command(
         "chart",
-        INPUT_FILE,
-        "chart_output.xlsx",
+        input_files.employees,
+        output_file,
         sheet_name="Employees",
         chart_type="bar",
         x_column="Department",
@@ -279,10 +722,31 @@ def test_chart_action():
         chart_title="Salary Chart"
     )
     assert result.returncode == 0
-    assert "Action 'chart' completed successfully" in result.stdout
+    assert result.ok_action == "chart"
 
-    workbook = openpyxl.load_workbook("chart_output.xlsx")
-    assert "Salary Chart" in workbook.sheetnames
+    assert "Salary Chart" in _sheet_names(output_file)
+    workbook = openpyxl.load_workbook(output_file)
     sheet = workbook["Salary Chart"]
     assert sheet._charts
     assert sheet._charts[0].title.tx.rich.p[0].r[0].t == "Department Salaries"
+
+def test_chart_action_non_adjacent_columns(input_files, tmp_path):
+    """Test the chart action with y-columns that do not form one contiguous range."""
+    output_file = tmp_path / "chart_columns_output.xlsx"
+    result = run_cli_command(
+        "chart",
+        input_files.employees,
+        output_file,
+        sheet_name="Employees",
+        chart_type="line",
+        x_column="Name",
+        y_columns=["Rating", "Salary"],
+        chart_title="Salary Chart"
+    )
+    assert result.returncode == 0
+    assert result.ok_action == "chart"
+
+    workbook = openpyxl.load_workbook(output_file)
+    series = workbook["Salary Chart"]._charts[0].series
+    assert [s.tx.strRef.f for s in series] == ["'Employees'!D1", "'Employees'!C1"]
+    assert [s.val.numRef.f for s in series] == ["'Employees'!$D$2:$D$7", "'Employees'!$C$2:$C$7"]